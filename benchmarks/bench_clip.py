@@ -0,0 +1,265 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Airspeed velocity (asv) benchmarks for the pypolyclip clipping
+functions.
+
+See ``benchmarks/README.md`` for instructions on running them.
+"""
+import numpy as np
+
+from pypolyclip import clip_multi, clip_single, polyclip
+from pypolyclip.pypolyclip import FLT, INT, _aggregate_pixels, _bounding_boxes
+
+# the number of polygons to clip
+NPOLY = [10**3, 10**4, 10**5, 10**6, 10**7]
+
+# the polygon shapes (see _make_polygons)
+SHAPES = ['square', 'rotated', 'trace', 'ragged']
+
+# the size of the (square) pixel grid
+GRIDS = [1024, 8192]
+
+# the type of input coordinates passed to clip_multi
+INPUTS = ['array', 'list']
+
+# the list input loops over polygons in Python, so cap its size to keep
+# the full suite runnable in a reasonable amount of time
+MAX_NPOLY_LIST = 10**6
+
+# skip any case whose bounding boxes cover more pixels than this, as the
+# output buffers alone would need several GB of memory
+MAX_BBOX_PIXELS = 2 * 10**8
+
+
+def _make_polygons(shape, npoly, ngrid, seed=0):
+    """
+    Make a set of random polygons that lie within a pixel grid.
+
+    Parameters
+    ----------
+    shape : {'square', 'rotated', 'trace', 'ragged'}
+        The type of polygons to make:
+
+        * ``'square'``: pixel-aligned unit squares
+        * ``'rotated'``: unit squares with a random rotation
+        * ``'trace'``: long thin (20 x 0.3 pixel) nearly-horizontal
+          quadrilaterals, similar to a dispersed spectral trace
+        * ``'ragged'``: a random mix of triangles and hexagons
+
+    npoly : int
+        The number of polygons.
+
+    ngrid : int
+        The size of the square pixel grid.
+
+    seed : int, optional
+        The seed for the random number generator.
+
+    Returns
+    -------
+    x, y : 2D `np.ndarray` or list of 1D `np.ndarray`
+        The x and y vertices of the polygons. The ``'ragged'`` polygons
+        are returned as lists, all others as 2D arrays.
+    """
+    rng = np.random.default_rng(seed)
+
+    # keep a margin so that the polygons lie within the grid
+    x0 = rng.uniform(25, ngrid - 25, npoly)[:, np.newaxis]
+    y0 = rng.uniform(25, ngrid - 25, npoly)[:, np.newaxis]
+
+    if shape == 'square':
+        x = x0 + np.array([0.0, 0.0, 1.0, 1.0])
+        y = y0 + np.array([0.0, 1.0, 1.0, 0.0])
+    elif shape == 'rotated':
+        theta = (rng.uniform(0, np.pi / 2, npoly)[:, np.newaxis]
+                 + np.array([0.25, 0.75, 1.25, 1.75]) * np.pi)
+        x = x0 + np.cos(theta) / np.sqrt(2)
+        y = y0 + np.sin(theta) / np.sqrt(2)
+    elif shape == 'trace':
+        theta = rng.uniform(-0.02, 0.02, npoly)[:, np.newaxis]
+        u = np.array([-10.0, -10.0, 10.0, 10.0])
+        v = np.array([-0.15, 0.15, 0.15, -0.15])
+        x = x0 + u * np.cos(theta) - v * np.sin(theta)
+        y = y0 + u * np.sin(theta) + v * np.cos(theta)
+    elif shape == 'ragged':
+        nverts = rng.choice([3, 6], npoly)
+        radius = rng.uniform(0.5, 1.5, npoly)
+        theta0 = rng.uniform(0, 2 * np.pi, npoly)
+        x = []
+        y = []
+        for i in range(npoly):
+            theta = theta0[i] + np.arange(nverts[i]) * 2 * np.pi / nverts[i]
+            x.append(x0[i, 0] + radius[i] * np.cos(theta))
+            y.append(y0[i, 0] + radius[i] * np.sin(theta))
+    else:
+        msg = f'Invalid polygon shape: {shape}'
+        raise ValueError(msg)
+
+    return x, y
+
+
+def _setup_input(npoly, shape, grid, kind):
+    """
+    Make the clip_multi inputs for a benchmark, skipping (by raising
+    `NotImplementedError`) any unsupported or too-large case.
+    """
+    if kind == 'array' and shape == 'ragged':
+        msg = 'ragged polygons cannot be input as arrays'
+        raise NotImplementedError(msg)
+    if kind == 'list' and npoly > MAX_NPOLY_LIST:
+        msg = 'too many polygons for list input'
+        raise NotImplementedError(msg)
+
+    nxy = (grid, grid)
+    x, y = _make_polygons(shape, npoly, grid)
+
+    l, r, b, t, _ = _bounding_boxes(x, y, nxy)  # noqa: E741
+    npix = np.sum((r - l + 1) * (t - b + 1), dtype=np.int64)
+    if npix > MAX_BBOX_PIXELS:
+        msg = 'too many bounding-box pixels'
+        raise NotImplementedError(msg)
+
+    if kind == 'list' and isinstance(x, np.ndarray):
+        x = list(x)
+        y = list(y)
+
+    return x, y, nxy
+
+
+class ClipMulti:
+    """
+    Benchmarks for the full clip_multi call.
+    """
+
+    params = (NPOLY, SHAPES, GRIDS, INPUTS)
+    param_names = ['npoly', 'shape', 'grid', 'input']
+    timeout = 600
+
+    def setup(self, npoly, shape, grid, kind):
+        self.x, self.y, self.nxy = _setup_input(npoly, shape, grid, kind)
+
+    def time_clip_multi(self, npoly, shape, grid, kind):
+        clip_multi(self.x, self.y, self.nxy)
+
+    def peakmem_clip_multi(self, npoly, shape, grid, kind):
+        clip_multi(self.x, self.y, self.nxy)
+
+
+class ClipMultiProcess:
+    """
+    Benchmarks for clip_multi with a pool of worker processes.
+    """
+
+    params = (NPOLY, ['square', 'trace'], [1, 2, 4, 8])
+    param_names = ['npoly', 'shape', 'workers']
+    timeout = 600
+
+    def setup(self, npoly, shape, workers):
+        self.x, self.y, self.nxy = _setup_input(npoly, shape, 8192, 'array')
+
+    def time_clip_multi(self, npoly, shape, workers):
+        clip_multi(self.x, self.y, self.nxy, executor='process',
+                   workers=workers)
+
+
+class ClipMultiInputStages:
+    """
+    Benchmarks for the clip_multi stages that depend on the type of
+    input coordinates.
+    """
+
+    params = (NPOLY, SHAPES, GRIDS, INPUTS)
+    param_names = ['npoly', 'shape', 'grid', 'input']
+    timeout = 600
+
+    def setup(self, npoly, shape, grid, kind):
+        self.x, self.y, self.nxy = _setup_input(npoly, shape, grid, kind)
+
+    def time_bounding_boxes(self, npoly, shape, grid, kind):
+        _bounding_boxes(self.x, self.y, self.nxy)
+
+    def time_hstack(self, npoly, shape, grid, kind):
+        np.hstack(self.x).astype(FLT)
+        np.hstack(self.y).astype(FLT)
+
+
+class ClipMultiStages:
+    """
+    Benchmarks for the clip_multi stages that are independent of the
+    type of input coordinates.
+    """
+
+    params = (NPOLY, SHAPES, GRIDS)
+    param_names = ['npoly', 'shape', 'grid']
+    timeout = 600
+
+    def setup(self, npoly, shape, grid):
+        kind = 'list' if shape == 'ragged' else 'array'
+        x, y, nxy = _setup_input(npoly, shape, grid, kind)
+
+        self.l, self.r, self.b, self.t, self.indices = _bounding_boxes(
+            x, y, nxy)
+        self.npoly = len(self.l)
+        self.px = np.hstack(x).astype(FLT)
+        self.py = np.hstack(y).astype(FLT)
+
+        npix = np.sum((self.r - self.l + 1) * (self.t - self.b + 1))
+        self.areas = np.empty(npix, dtype=FLT)
+        self.xx = np.empty(npix, dtype=INT)
+        self.yy = np.empty(npix, dtype=INT)
+
+        # the C code overwrites the polygon indices with the output
+        # indices, which are needed for the slices
+        self.out_indices = self.indices.copy()
+        self.nclip = self._clip(self.out_indices)
+
+    def _clip(self, indices):
+        nclip = np.zeros(1, dtype=INT)
+        counts = np.zeros(2, dtype=np.int64)
+        polyclip.multi(self.l, self.r, self.b, self.t, self.px, self.py,
+                       self.npoly, indices, self.xx, self.yy, nclip,
+                       self.areas, counts)
+        return nclip[0]
+
+    def time_allocate(self, npoly, shape, grid):
+        npix = len(self.areas)
+        np.empty(npix, dtype=FLT)
+        np.empty(npix, dtype=INT)
+        np.empty(npix, dtype=INT)
+
+    def time_clip(self, npoly, shape, grid):
+        # the index copy is negligible compared to the clipping
+        self._clip(self.indices.copy())
+
+    def time_slices(self, npoly, shape, grid):
+        indices = self.out_indices
+        [slice(indices[i], indices[i + 1], 1) for i in range(self.npoly)]
+
+    def time_aggregate(self, npoly, shape, grid):
+        _aggregate_pixels(self.xx[:self.nclip], self.yy[:self.nclip],
+                          self.areas[:self.nclip], (grid, grid))
+
+
+class ClipSingle:
+    """
+    Benchmarks for clip_single on a large regular polygon.
+    """
+
+    params = ([10, 100, 1000], [4, 6, 32])
+    param_names = ['radius', 'nverts']
+
+    def setup(self, radius, nverts):
+        theta = np.arange(nverts) * 2 * np.pi / nverts + 0.1
+        center = radius + 5.3
+        self.x = center + radius * np.cos(theta)
+        self.y = center + radius * np.sin(theta)
+        self.nxy = (2 * radius + 11, 2 * radius + 11)
+
+    def time_clip_single(self, radius, nverts):
+        clip_single(self.x, self.y, self.nxy)
+
+    def time_clip_single_polygons(self, radius, nverts):
+        clip_single(self.x, self.y, self.nxy, return_polygons=True)
+
+    def peakmem_clip_single_polygons(self, radius, nverts):
+        clip_single(self.x, self.y, self.nxy, return_polygons=True)
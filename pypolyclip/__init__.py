@@ -8,4 +8,9 @@ try:
 except ImportError:
     __version__ = ''
 
-from pypolyclip.pypolyclip import clip_multi, clip_single  # noqa: F401
+from pypolyclip.overlaps import (clip_multi_cached,  # noqa: F401
+                                 load_overlaps, polygon_hash,
+                                 save_overlaps)
+from pypolyclip.profiling import profile  # noqa: F401
+from pypolyclip.pypolyclip import (clip_multi, clip_single,  # noqa: F401
+                                   decode_areas)
@@ -0,0 +1,26 @@
+/*
+
+     C header file for aggregating the polyclip outputs by pixel.
+
+     The outputs of polyclip_multi have one entry for each overlapping
+     polygon and pixel.  The function here sorts these entries by their
+     linear pixel index and sums the areas of the duplicate pixels.
+
+*/
+
+#ifndef AGGREGATE_H
+#define AGGREGATE_H
+
+/* The unique pixels (see polyclip_aggregate) */
+typedef struct {
+  unsigned long long *key;   /* linear pixel indices (yy*(nx+1)+xx) */
+  double *area;              /* summed areas */
+  int *count;                /* number of contributing polygons */
+  int nuniq;                 /* number of unique pixels */
+} aggregate_t;
+
+int polyclip_aggregate(int,int,int*,int*,float*,aggregate_t*);
+void polyclip_aggregate_copy(aggregate_t*,int,int*,int*,float*,int*);
+void polyclip_aggregate_free(aggregate_t*);
+
+#endif
@@ -10,6 +10,7 @@
 
      Version 1: May 7, 2019
      Version 2: Feb 1, 2023 (added more comments.  RR)
+     Version 3: Oct 19, 2026 (added clipping statistics to polyclip_multi)
 */
 
 #ifndef POLYCLIP_H
@@ -22,7 +23,7 @@ int  polyclip_inside(float, float, int, int, int);
 void polyclip_intersect(float, float, int, int, int);
 float polyclip_area(float *,float *, int );
 char polyclip_test(void);
-void polyclip_multi(int*,int*,int*,int*,float*,float*,int,int*,int*,int*,int*,float*);
+void polyclip_multi(int*,int*,int*,int*,float*,float*,int,int*,int*,int*,int*,float*,long long*,long long*);
 void polyclip_single(int,int,int,int,float*,float*,int,int*,int*,float*,float*,float*,int*);
 
 #endif
@@ -0,0 +1,352 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Module that provides tools to save, load, and cache the overlaps of
+polygons with a pixel grid.
+
+The overlaps are stored in a simple binary format that can be memory
+mapped. The file starts with an 8-byte magic string (``MAGIC``) and a
+little-endian uint32 giving the length of a UTF-8 JSON header.
+The header describes the pixel grid, the key (e.g., the `polygon_hash`)
+of the input polygons, and the data type, shape, and byte offset of the
+``offsets``, ``index``, and ``areas`` arrays, which follow the header
+as raw little-endian data, each aligned to 64 bytes.
+"""
+import hashlib
+import itertools
+import json
+import os
+
+import numpy as np
+
+from pypolyclip.pypolyclip import AREA_DTYPES, FLT, _pixel_index, clip_multi
+
+# the magic string at the start of an overlaps file
+MAGIC = b'\x93PPCOVL1'
+
+# the alignment (in bytes) of the header and arrays in an overlaps file
+ALIGN = 64
+
+# the version of the overlaps file format
+VERSION = 1
+
+
+def polygon_hash(x, y, nxy):
+    """
+    Compute a hash of polygons and a pixel grid.
+
+    The hash can be used as a key to identify the overlaps of the
+    polygons with the pixel grid, e.g., in `save_overlaps`.
+
+    Parameters
+    ----------
+    x, y : 2D `np.ndarray` or list/tuple of 1D array-like of float
+        The x and y coordinates of the polygon corners. See
+        `clip_multi`.
+
+    nxy : list, tuple, or `np.ndarray` of 2 int
+        The size of the pixel grid.
+
+    Returns
+    -------
+    key : str
+        The SHA-256 hash (as a hexadecimal string) of the grid size, the
+        number of vertices of each polygon, and the vertices (as 32-bit
+        floats, as they are clipped).
+    """
+    if isinstance(x, np.ndarray) and isinstance(y, np.ndarray):
+        nverts = np.full(x.shape[0], x.shape[1])
+        px = np.ravel(x)
+        py = np.ravel(y)
+    elif isinstance(x, (tuple, list)) and isinstance(y, (tuple, list)):
+        nverts = np.array([len(_x) for _x in x])
+        px = np.hstack(x)
+        py = np.hstack(y)
+    else:
+        msg = 'Invalid types for the input polygons.'
+        raise TypeError(msg)
+
+    sha = hashlib.sha256()
+    sha.update(np.asarray(nxy, dtype='<i8').tobytes())
+    sha.update(nverts.astype('<i8').tobytes())
+    sha.update(px.astype('<f4').tobytes())
+    sha.update(py.astype('<f4').tobytes())
+    return sha.hexdigest()
+
+
+def _align(nbytes):
+    """
+    Round a number of bytes up to a multiple of ``ALIGN``.
+    """
+    return -(-nbytes // ALIGN) * ALIGN
+
+
+def _result_arrays(result, nxy):
+    """
+    Get the linear pixel indices, areas, and slices of a `clip_multi`
+    result.
+
+    Parameters
+    ----------
+    result : tuple
+        The outputs of `clip_multi` (see `save_overlaps`).
+
+    nxy : list, tuple, or `np.ndarray` of 2 int
+        The size of the pixel grid.
+
+    Returns
+    -------
+    index : 1D `np.ndarray` of int
+        The linear pixel indices.
+
+    areas : 1D `np.ndarray` of float or uint16
+        The overlapping areas.
+
+    slices : list of slice objects
+        The slices that map between the input polygons and the outputs.
+    """
+    if result and isinstance(result[-1], dict):
+        msg = 'Cannot save clip_multi results with stats=True.'
+        raise ValueError(msg)
+    if not (result and isinstance(result[-1], list)
+            and all(isinstance(s, slice) for s in result[-1])):
+        msg = ('Cannot save clip_multi results without slices (e.g., '
+               'with aggregate="pixel").')
+        raise ValueError(msg)
+
+    if len(result) == 4:
+        xx, yy, areas, slices = result
+        xx = np.asarray(xx)
+        yy = np.asarray(yy)
+        if np.any(xx >= nxy[0]) or np.any(yy >= nxy[1]):
+            msg = ('Pixels outside of the grid cannot be saved; use '
+                   'clip_multi with index=True.')
+            raise ValueError(msg)
+        index = _pixel_index(xx, yy, nxy)
+    elif len(result) == 3:
+        index, areas, slices = result
+    else:
+        msg = 'Invalid clip_multi result.'
+        raise ValueError(msg)
+
+    areas = np.asarray(areas)
+    if areas.dtype not in AREA_DTYPES:
+        msg = f'Invalid area dtype: {areas.dtype}.'
+        raise ValueError(msg)
+
+    return np.asarray(index), areas, slices
+
+
+def save_overlaps(path, result, nxy, *, key=''):
+    """
+    Save the overlaps of polygons with a pixel grid to a file.
+
+    Parameters
+    ----------
+    path : str or path-like
+        The name of the output file. An existing file is overwritten.
+
+    result : tuple
+        The outputs of `clip_multi`, either ``(xx, yy, areas, slices)``
+        or ``(index, areas, slices)`` (with ``index=True``). The areas
+        can have any ``area_dtype``, but the results of
+        ``aggregate='pixel'`` or ``stats=True`` cannot be saved.
+
+    nxy : list, tuple, or `np.ndarray` of 2 int
+        The size of the pixel grid.
+
+    key : str, optional
+        A key that identifies the input polygons, e.g., from
+        `polygon_hash`.
+
+    Notes
+    -----
+    The overlaps are stored as linear pixel indices (``yy * nxy[0] +
+    xx``), so the ``xx`` and ``yy`` pixel indices must be within the
+    pixel grid. The slices are stored as an array of offsets, such that
+    ``offsets[i]:offsets[i + 1]`` are the overlaps of polygon ``i``.
+    """
+    index, areas, slices = _result_arrays(result, nxy)
+
+    offsets = np.zeros(len(slices) + 1, dtype=np.int64)
+    if slices:
+        offsets[0] = slices[0].start
+        offsets[1:] = [s.stop for s in slices]
+
+    arrays = {'offsets': offsets, 'index': index, 'areas': areas}
+
+    # compute the layout of the arrays, relative to the start of the
+    # data (which follows the header)
+    header = {'version': VERSION, 'nxy': [int(n) for n in nxy],
+              'key': key, 'arrays': {}}
+    nbytes = 0
+    for name, array in arrays.items():
+        dtype = array.dtype.newbyteorder('<')
+        header['arrays'][name] = {'dtype': dtype.str,
+                                  'shape': list(array.shape),
+                                  'offset': nbytes}
+        nbytes += _align(array.size * dtype.itemsize)
+    header_bytes = json.dumps(header).encode()
+    start = _align(len(MAGIC) + 4 + len(header_bytes))
+
+    # write to a temporary file first, so that an interrupted write
+    # cannot leave a corrupt file behind
+    tmp_path = f'{os.fspath(path)}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as fh:
+            fh.write(MAGIC)
+            fh.write(np.array(len(header_bytes), dtype='<u4').tobytes())
+            fh.write(header_bytes)
+            for name, array in arrays.items():
+                layout = header['arrays'][name]
+                fh.seek(start + layout['offset'])
+                np.ascontiguousarray(array, dtype=layout['dtype']).tofile(fh)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_header(fh):
+    """
+    Read the header of an overlaps file.
+
+    Parameters
+    ----------
+    fh : file object
+        The overlaps file, opened in binary mode.
+
+    Returns
+    -------
+    header : dict
+        The header.
+
+    start : int
+        The byte offset of the start of the data.
+    """
+    magic = fh.read(len(MAGIC))
+    if magic != MAGIC:
+        msg = 'Not a pypolyclip overlaps file.'
+        raise ValueError(msg)
+    length = int(np.frombuffer(fh.read(4), dtype='<u4')[0])
+    header = json.loads(fh.read(length).decode())
+    if header['version'] != VERSION:
+        msg = f'Unsupported overlaps file version: {header["version"]}.'
+        raise ValueError(msg)
+
+    return header, _align(len(MAGIC) + 4 + length)
+
+
+def load_overlaps(path, *, mmap=True, return_header=False):
+    """
+    Load the overlaps of polygons with a pixel grid from a file.
+
+    Parameters
+    ----------
+    path : str or path-like
+        The name of a file written by `save_overlaps`.
+
+    mmap : bool, optional
+        If `True`, then the ``index`` and ``areas`` arrays are read-only
+        memory maps of the file (i.e., they are not read into memory
+        until they are accessed). Otherwise, they are read into memory.
+        The default is `True`.
+
+    return_header : bool, optional
+        If `True`, then the file header will also be returned. The
+        default is `False`.
+
+    Returns
+    -------
+    index : 1D `np.ndarray` of int
+        The linear pixel indices (``yy * nxy[0] + xx``) that have
+        overlapping area.
+
+    areas : 1D `np.ndarray` of float or uint16
+        The overlapping area on a given pixel, with the data type they
+        were saved with (see `decode_areas`).
+
+    slices : list of slice objects
+        A list of slice objects that maps between the input polygons
+        and the outputs.
+
+    header : dict
+        The file header, including the size of the pixel grid
+        (``'nxy'``) and the key of the input polygons (``'key'``). Only
+        returned if ``return_header=True``.
+    """
+    with open(path, 'rb') as fh:
+        header, start = _read_header(fh)
+
+        arrays = {}
+        for name, layout in header['arrays'].items():
+            dtype = np.dtype(layout['dtype'])
+            shape = tuple(layout['shape'])
+            offset = start + layout['offset']
+            if mmap and np.prod(shape) > 0:
+                arrays[name] = np.memmap(fh, dtype=dtype, mode='r',
+                                         offset=offset, shape=shape)
+            else:
+                fh.seek(offset)
+                arrays[name] = np.fromfile(fh, dtype=dtype,
+                                           count=int(np.prod(shape)))
+                arrays[name] = arrays[name].reshape(shape)
+
+    offsets = arrays['offsets'].tolist()
+    slices = [slice(start, stop, 1)
+              for start, stop in itertools.pairwise(offsets)]
+
+    if return_header:
+        return arrays['index'], arrays['areas'], slices, header
+    return arrays['index'], arrays['areas'], slices
+
+
+def clip_multi_cached(x, y, nxy, cache_dir, *, area_dtype=FLT, mmap=True):
+    """
+    Clip multiple polygons against a pixel grid, caching the overlaps
+    on disk.
+
+    The overlaps are saved in ``cache_dir`` in a file named by the
+    `polygon_hash` of the polygons and pixel grid. If the same polygons
+    and pixel grid are clipped again, the clipping is skipped and the
+    overlaps are loaded from the file instead.
+
+    Parameters
+    ----------
+    x, y : 2D `np.ndarray` or list/tuple of 1D array-like of float
+        The x and y coordinates of the polygon corners. See
+        `clip_multi`.
+
+    nxy : list, tuple, or `np.ndarray` of 2 int
+        The size of the pixel grid.
+
+    cache_dir : str or path-like
+        The directory of the cached overlaps files. It is created if it
+        does not exist.
+
+    area_dtype : {`np.float32`, `np.float16`, `np.uint16`}, optional
+        The data type of the output ``areas``. See `clip_multi`.
+
+    mmap : bool, optional
+        If `True`, then the cached overlaps are memory mapped. See
+        `load_overlaps`.
+
+    Returns
+    -------
+    index, areas, slices
+        The outputs of `clip_multi` with ``index=True``.
+    """
+    key = polygon_hash(x, y, nxy)
+    area_dtype = np.dtype(area_dtype)
+    path = os.path.join(cache_dir, f'{key}-{area_dtype.name}.overlaps')
+
+    if os.path.exists(path):
+        index, areas, slices, header = load_overlaps(
+            path, mmap=mmap, return_header=True)
+        if header['key'] == key and areas.dtype == area_dtype:
+            return index, areas, slices
+
+    result = clip_multi(x, y, nxy, index=True, area_dtype=area_dtype)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_overlaps(path, result, nxy, key=key)
+
+    return result
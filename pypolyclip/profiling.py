@@ -0,0 +1,161 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Module that provides tools to profile the polygon clipping.
+"""
+from contextlib import contextmanager
+
+import numpy as np
+
+# the statistics of the active profile contexts
+_PROFILES = []
+
+# the stages of clip_multi that are timed
+_STAGES = ('bbox', 'hstack', 'allocate', 'clip', 'slices', 'trim',
+           'aggregate', 'encode')
+
+# the statistics that are summed over multiple calls
+_COUNTS = ('npoly', 'npix_allocated', 'npix_visited', 'npix_clipped',
+           'npix_degenerate', 'npix_empty')
+
+
+def _overallocation(stats):
+    """
+    Compute the ratio of allocated to clipped pixels.
+    """
+    if stats['npix_clipped'] == 0:
+        return np.inf
+    return stats['npix_allocated'] / stats['npix_clipped']
+
+
+def _make_stats(times, npoly, npix, nclip, counts):
+    """
+    Make the statistics of a single clip_multi call.
+
+    Parameters
+    ----------
+    times : list of float
+        The `time.perf_counter` values at the start of the call and at
+        the end of each stage in ``_STAGES``.
+
+    npoly : int
+        The number of input polygons.
+
+    npix : int
+        The number of pixels allocated for the output arrays.
+
+    nclip : int
+        The number of output pixels.
+
+    counts : 1D `np.ndarray` of int
+        The number of visited pixels and degenerate clipped polygons
+        returned by the C code.
+
+    Returns
+    -------
+    stats : dict
+        The clipping statistics (see `profile`).
+    """
+    nvisit, ndegen = (int(count) for count in counts)
+    stats = {
+        'ncalls': 1,
+        'npoly': int(npoly),
+        'npix_allocated': int(npix),
+        'npix_visited': nvisit,
+        'npix_clipped': int(nclip),
+        'npix_degenerate': ndegen,
+        'npix_empty': nvisit - int(nclip) - ndegen,
+    }
+    stats['overallocation'] = _overallocation(stats)
+    for stage, start, end in zip(_STAGES, times[:-1], times[1:],
+                                 strict=True):
+        stats[f'time_{stage}'] = end - start
+    stats['time_total'] = times[-1] - times[0]
+
+    return stats
+
+
+def _record(stats):
+    """
+    Add the statistics of a single clip_multi call to all of the active
+    profile contexts.
+
+    Parameters
+    ----------
+    stats : dict
+        The clipping statistics (see `_make_stats`).
+    """
+    for total in _PROFILES:
+        for key in ('ncalls', *_COUNTS):
+            total[key] += stats[key]
+        for key in stats:
+            if key.startswith('time_'):
+                total[key] += stats[key]
+        total['overallocation'] = _overallocation(total)
+
+
+@contextmanager
+def profile():
+    """
+    Context manager to collect statistics for all `clip_multi` calls
+    made within the context.
+
+    Yields
+    ------
+    stats : dict
+        The statistics summed over all `clip_multi` calls made within
+        the context. The dictionary is updated in place after each call
+        and has the following keys:
+
+        * ``'ncalls'``: the number of `clip_multi` calls
+        * ``'npoly'``: the number of input polygons
+        * ``'npix_allocated'``: the number of pixels allocated for the
+          output arrays
+        * ``'npix_visited'``: the number of bounding-box pixels that
+          were clipped
+        * ``'npix_clipped'``: the number of output pixels (i.e., with
+          non-zero overlapping area)
+        * ``'npix_degenerate'``: the number of pixels whose clipped
+          polygon was degenerate (zero area) and was discarded
+        * ``'npix_empty'``: the number of pixels that do not overlap
+          the polygon at all
+        * ``'overallocation'``: the ratio of allocated to output pixels
+          (`np.inf` if there are no output pixels)
+        * ``'time_bbox'``, ``'time_hstack'``, ``'time_allocate'``,
+          ``'time_clip'``, ``'time_slices'``, ``'time_trim'``,
+          ``'time_aggregate'``, and ``'time_encode'``: the time (in
+          seconds) spent computing the bounding boxes, stacking the
+          input vertices, allocating the output arrays, clipping the
+          polygons in the C code, building the slices, trimming the
+          output arrays, aggregating the outputs by pixel, and encoding
+          the output pixel indices and areas, respectively
+        * ``'time_total'``: the total time (in seconds)
+
+    Notes
+    -----
+    The statistics of a single call can also be returned with the
+    ``stats`` keyword of `clip_multi`.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pypolyclip import clip_multi, profile
+    >>> px = np.array([[3.4, 3.4, 4.4, 4.4]])
+    >>> py = np.array([[1.4, 1.9, 1.9, 1.4]])
+    >>> with profile() as stats:
+    ...     _ = clip_multi(px, py, (100, 100))
+    >>> stats['npix_clipped']
+    2
+    """
+    stats = dict.fromkeys(('ncalls', *_COUNTS), 0)
+    stats['overallocation'] = np.inf
+    for stage in (*_STAGES, 'total'):
+        stats[f'time_{stage}'] = 0.0
+
+    _PROFILES.append(stats)
+    try:
+        yield stats
+    finally:
+        # remove by identity, as nested contexts may have equal stats
+        index = next(i for i, total in enumerate(_PROFILES)
+                     if total is stats)
+        del _PROFILES[index]
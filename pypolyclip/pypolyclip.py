@@ -5,16 +5,428 @@ Module that provides a Python interface to polyclip.c.
 The polyclip.c code is a fast polygon clipper that can be used to clip
 polygons against a tessellated grid of square pixels.
 """
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import numpy as np
 
 from pypolyclip import polyclip
+from pypolyclip.profiling import _PROFILES, _make_stats, _record
 
 # NEVER CHANGE THESE WITHOUT ADDRESSING DATATYPES INSIDE THE C CODE
 INT = np.int32
 FLT = np.float32
 
+# the scale factor for areas quantized to uint16 (i.e., an area of 1 is
+# stored as 65535)
+AREA_SCALE = np.iinfo(np.uint16).max
+
+# the allowed data types of the output areas
+AREA_DTYPES = (np.dtype(np.float32), np.dtype(np.float16),
+               np.dtype(np.uint16))
+
+
+def _bounding_boxes(x, y, nxy):
+    """
+    Compute the pixel bounding boxes and vertex indices of polygons.
+
+    Parameters
+    ----------
+    x, y : 2D `np.ndarray` or list/tuple of 1D array-like of float
+        The x and y coordinates of the polygon corners. See
+        `clip_multi`.
+
+    nxy : list, tuple, or `np.ndarray` of 2 int
+        The size of the pixel grid.
+
+    Returns
+    -------
+    l, r, b, t : 1D `np.ndarray` of int
+        The left, right, bottom, and top pixel of each polygon's
+        bounding box, clipped to the pixel grid.
+
+    indices : 1D `np.ndarray` of int
+        The reverse indices into the stacked vertices, such that
+        ``indices[i]:indices[i + 1]`` are the vertices of polygon ``i``.
+    """
+    if isinstance(x, np.ndarray) and isinstance(y, np.ndarray):
+        # if here, then the inputs are numpy arrays, and so the polygons
+        # all have the same number of vertices.  Therefore, we can use
+        # numpy operations to do many calculations
+        l = np.clip(np.floor(np.amin(x, axis=1)), 0, nxy[0]).astype(INT)  # noqa: E741
+        r = np.clip(np.floor(np.amax(x, axis=1)), 0, nxy[0]).astype(INT)
+        b = np.clip(np.floor(np.amin(y, axis=1)), 0, nxy[1]).astype(INT)
+        t = np.clip(np.floor(np.amax(y, axis=1)), 0, nxy[1]).astype(INT)
+
+        # make some polygon indices
+        npoly = x.shape[0]
+        indices = np.linspace(0, x.size, npoly + 1, dtype=INT)
+    elif isinstance(x, (tuple, list)) and isinstance(y, (tuple, list)):
+        # if here, then the inputs are a list, which can permit polygons
+        # to have differing number of vertices (such as a triangle and a
+        # quadrilateral).  Therefore, we must explicitly loop over the
+        # polygons --- which is more costly, but more general.
+        npoly = len(x)
+        l = np.empty(npoly, dtype=INT)  # noqa: E741
+        r = np.empty(npoly, dtype=INT)
+        b = np.empty(npoly, dtype=INT)
+        t = np.empty(npoly, dtype=INT)
+        indices = np.empty(npoly + 1, dtype=INT)
+        indices[0] = 0
+        for i, (_x, _y) in enumerate(zip(x, y, strict=False)):
+            l[i] = np.clip(np.floor(np.amin(_x)), 0, nxy[0])
+            r[i] = np.clip(np.floor(np.amax(_x)), 0, nxy[0])
+            b[i] = np.clip(np.floor(np.amin(_y)), 0, nxy[1])
+            t[i] = np.clip(np.floor(np.amax(_y)), 0, nxy[1])
+            indices[i + 1] = indices[i] + len(_x)
+    else:
+        msg = 'Invalid types for the input polygons.'
+        raise TypeError(msg)
+
+    return l, r, b, t, indices
+
+
+def _aggregate_pixels(xx, yy, areas, nxy):
+    """
+    Aggregate the clipped pixels by summing the areas of duplicate
+    pixels.
+
+    Parameters
+    ----------
+    xx, yy : 1D `np.ndarray` of int
+        The x and y pixel indices.
+
+    areas : 1D `np.ndarray` of float
+        The overlapping area on a given pixel.
+
+    nxy : list, tuple, or `np.ndarray` of 2 int
+        The size of the pixel grid.
+
+    Returns
+    -------
+    xx, yy : 1D `np.ndarray` of int
+        The x and y indices of the unique pixels, sorted by ``yy`` and
+        then ``xx``.
+
+    areas : 1D `np.ndarray` of float
+        The summed overlapping area on a given pixel.
+
+    counts : 1D `np.ndarray` of int
+        The number of entries that were summed for a given pixel.
+    """
+    # call the compiled C-code, which allocates the outputs once the
+    # number of unique pixels is known
+    return polyclip.aggregate(len(xx), nxy[0], np.ascontiguousarray(xx),
+                              np.ascontiguousarray(yy),
+                              np.ascontiguousarray(areas))
+
+
+def _pixel_index(xx, yy, nxy):
+    """
+    Compute the linear pixel indices.
+
+    Parameters
+    ----------
+    xx, yy : 1D `np.ndarray` of int
+        The x and y pixel indices.
+
+    nxy : list, tuple, or `np.ndarray` of 2 int
+        The size of the pixel grid.
+
+    Returns
+    -------
+    index : 1D `np.ndarray` of int
+        The linear pixel indices (``yy * nxy[0] + xx``), as `np.int32` if
+        possible, otherwise as `np.int64`.
+    """
+    npix = int(nxy[0]) * int(nxy[1])
+    dtype = INT if npix <= np.iinfo(INT).max else np.int64
+
+    index = yy.astype(dtype)
+    index *= nxy[0]
+    index += xx
+    return index
+
+
+def _encode_areas(areas, area_dtype):
+    """
+    Convert the areas to the output data type.
+
+    Parameters
+    ----------
+    areas : 1D `np.ndarray` of float
+        The overlapping areas.
+
+    area_dtype : `np.dtype`
+        The output data type (one of ``AREA_DTYPES``).
+
+    Returns
+    -------
+    areas : 1D `np.ndarray`
+        The areas with a data type of ``area_dtype``.
+    """
+    if area_dtype == np.uint16:
+        # the (unaggregated) areas cannot exceed 1, but clip them to
+        # guard against round-off
+        areas = np.rint(areas * AREA_SCALE)
+        return np.clip(areas, 0, AREA_SCALE, out=areas).astype(area_dtype)
+    return areas.astype(area_dtype, copy=False)
+
+
+def decode_areas(areas):
+    """
+    Convert areas returned by `clip_multi` to floats.
+
+    Parameters
+    ----------
+    areas : 1D `np.ndarray`
+        The areas returned by `clip_multi` (with any ``area_dtype``).
+
+    Returns
+    -------
+    areas : 1D `np.ndarray` of float
+        The areas as `np.float32`. Areas quantized to `np.uint16` are
+        divided by 65535.
+    """
+    areas = np.asarray(areas)
+    if areas.dtype == np.uint16:
+        return (areas / FLT(AREA_SCALE)).astype(FLT)
+    return areas.astype(FLT, copy=False)
+
+
+def _validate_options(aggregate, area_dtype, executor, workers):
+    """
+    Validate the options of `clip_multi`.
+
+    Parameters
+    ----------
+    aggregate, area_dtype, executor, workers
+        The options of `clip_multi`.
+
+    Returns
+    -------
+    area_dtype : `np.dtype`
+        The data type of the output areas.
+    """
+    if aggregate not in (None, 'pixel'):
+        msg = f'Invalid aggregate value: {aggregate!r}.'
+        raise ValueError(msg)
+    area_dtype = np.dtype(area_dtype)
+    if area_dtype not in AREA_DTYPES:
+        msg = f'Invalid area_dtype: {area_dtype}.'
+        raise ValueError(msg)
+    if aggregate == 'pixel' and area_dtype == np.uint16:
+        msg = 'area_dtype=uint16 cannot be used with aggregate="pixel".'
+        raise ValueError(msg)
+    if executor not in (None, 'process'):
+        msg = f'Invalid executor value: {executor!r}.'
+        raise ValueError(msg)
+    if workers is not None:
+        if executor != 'process':
+            msg = 'workers can only be used with executor="process".'
+            raise ValueError(msg)
+        if not isinstance(workers, (int, np.integer)) or workers < 1:
+            msg = f'workers must be a positive integer: {workers!r}.'
+            raise ValueError(msg)
+
+    return area_dtype
+
+
+def _shared_arrays(buffer, layout):
+    """
+    Make arrays that are views of a shared memory buffer.
+
+    Parameters
+    ----------
+    buffer : `memoryview`
+        The shared memory buffer.
+
+    layout : dict
+        The data type, shape, and byte offset of each array, keyed by
+        the array name.
+
+    Returns
+    -------
+    arrays : dict of `np.ndarray`
+        The arrays, keyed by the array name.
+    """
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buffer,
+                             offset=offset)
+            for name, (dtype, shape, offset) in layout.items()}
+
+
+def _clip_shared(buffer, layout, start, stop, out_start):
+    """
+    Clip a range of polygons with inputs and outputs in shared memory.
+
+    Parameters
+    ----------
+    buffer : `memoryview`
+        The shared memory buffer.
+
+    layout : dict
+        The layout of the arrays in the shared memory buffer (see
+        `_shared_arrays`).
+
+    start, stop : int
+        The range of polygons to clip.
+
+    out_start : int
+        The index of the first output pixel for this range of polygons.
+
+    Returns
+    -------
+    nclip : int
+        The number of output pixels.
+
+    clip_counts : 1D `np.ndarray` of int
+        The number of visited pixels and degenerate clipped polygons.
+    """
+    arrays = _shared_arrays(buffer, layout)
+
+    # the C code overwrites the polygon indices with the output indices,
+    # so they are copied (and offset to the first polygon)
+    indices = arrays['indices'][start:stop + 1] - arrays['indices'][start]
+    vertices = slice(arrays['indices'][start], arrays['indices'][stop])
+    out_stop = out_start + np.sum(arrays['npix'][start:stop])
+
+    nclip = np.zeros(1, dtype=INT)
+    clip_counts = np.zeros(2, dtype=np.int64)
+    polyclip.multi(arrays['l'][start:stop], arrays['r'][start:stop],
+                   arrays['b'][start:stop], arrays['t'][start:stop],
+                   arrays['px'][vertices], arrays['py'][vertices],
+                   stop - start, indices,
+                   arrays['xx'][out_start:out_stop],
+                   arrays['yy'][out_start:out_stop], nclip,
+                   arrays['areas'][out_start:out_stop], clip_counts)
+    arrays['nclip_poly'][start:stop] = np.diff(indices)
+
+    return int(nclip[0]), clip_counts
+
+
+def _clip_worker(name, layout, start, stop, out_start):
+    """
+    Clip a range of polygons in a worker process (see `_clip_shared`).
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return _clip_shared(shm.buf, layout, start, stop, out_start)
+    finally:
+        shm.close()
+
+
+def _clip_multi_processes(l, r, b, t, px, py, indices, workers):  # noqa: E741
+    """
+    Clip multiple polygons with a pool of worker processes.
+
+    Parameters
+    ----------
+    l, r, b, t : 1D `np.ndarray` of int
+        The bounding boxes of the polygons (see `_bounding_boxes`).
+
+    px, py : 1D `np.ndarray` of float
+        The stacked vertices of the polygons.
+
+    indices : 1D `np.ndarray` of int
+        The reverse indices of the vertices (see `_bounding_boxes`). On
+        output, these are the reverse indices of the clipped pixels (as
+        for ``polyclip.multi``).
+
+    workers : int or `None`
+        The number of worker processes. If `None`, then the number of
+        CPUs is used.
+
+    Returns
+    -------
+    xx, yy : 1D `np.ndarray` of int
+        The x and y pixel indices that have overlapping area.
+
+    areas : 1D `np.ndarray` of float
+        The overlapping area on a given pixel.
+
+    nclip : 1D `np.ndarray` of int
+        The number of output pixels, as a 1-element array.
+
+    clip_counts : 1D `np.ndarray` of int
+        The number of visited pixels and degenerate clipped polygons.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    npoly = len(l)
+
+    # the (maximum) number of output pixels of each polygon and the
+    # index of each polygon's first output pixel
+    npix = (r - l + 1).astype(np.int64) * (t - b + 1)
+    out_end = np.cumsum(npix)
+    out_start = out_end - npix
+
+    # split the polygons into ranges with a similar number of pixels
+    bounds = np.searchsorted(out_end,
+                             np.arange(1, workers) * out_end[-1] / workers)
+    bounds = np.unique(np.concatenate(([0], bounds, [npoly])))
+    ranges = [(int(start), int(stop))
+              for start, stop in itertools.pairwise(bounds)]
+
+    # the layout of the inputs and outputs in shared memory
+    shapes = {'l': (INT, npoly), 'r': (INT, npoly), 'b': (INT, npoly),
+              't': (INT, npoly), 'indices': (INT, npoly + 1),
+              'px': (FLT, len(px)), 'py': (FLT, len(py)),
+              'npix': (np.int64, npoly), 'nclip_poly': (INT, npoly),
+              'xx': (INT, out_end[-1]), 'yy': (INT, out_end[-1]),
+              'areas': (FLT, out_end[-1])}
+    layout = {}
+    nbytes = 0
+    for name, (dtype, size) in shapes.items():
+        layout[name] = (np.dtype(dtype), (int(size),), nbytes)
+        nbytes += -(-int(size) * np.dtype(dtype).itemsize // 64) * 64
+
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    try:
+        arrays = _shared_arrays(shm.buf, layout)
+        for name, array in (('l', l), ('r', r), ('b', b), ('t', t),
+                            ('indices', indices), ('px', px), ('py', py),
+                            ('npix', npix)):
+            arrays[name][:] = array
+
+        methods = multiprocessing.get_all_start_methods()
+        method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        context = multiprocessing.get_context(method)
+        with ProcessPoolExecutor(max_workers=len(ranges),
+                                 mp_context=context) as pool:
+            futures = [pool.submit(_clip_worker, shm.name, layout, start,
+                                   stop, int(out_start[start]))
+                       for start, stop in ranges]
+            results = [future.result() for future in futures]
+
+        # gather the outputs of each range of polygons
+        out = [slice(out_start[start], out_start[start] + nclip)
+               for (start, _), (nclip, _) in zip(ranges, results,
+                                                 strict=True)]
+        xx = np.concatenate([arrays['xx'][s] for s in out], dtype=INT)
+        yy = np.concatenate([arrays['yy'][s] for s in out], dtype=INT)
+        areas = np.concatenate([arrays['areas'][s] for s in out],
+                               dtype=FLT)
+        indices[0] = 0
+        np.cumsum(arrays['nclip_poly'], out=indices[1:])
+
+        # release the views, so that the shared memory can be closed
+        del arrays
+    finally:
+        shm.close()
+        shm.unlink()
+
+    nclip = np.array([len(xx)], dtype=INT)
+    clip_counts = np.sum([counts for _, counts in results], axis=0,
+                         dtype=np.int64)
+    return xx, yy, areas, nclip, clip_counts
+
 
-def clip_multi(x, y, nxy):
+def clip_multi(x, y, nxy, *, aggregate=None, index=False,
+               area_dtype=FLT, executor=None, workers=None, stats=False):
     """
     Clip multiple polygons against a tessellated grid of square pixels.
 
@@ -31,6 +443,50 @@ def clip_multi(x, y, nxy):
     nxy : list, tuple, or `np.ndarray` of 2 int
         The size of the pixel grid.
 
+    aggregate : {None, 'pixel'}, optional
+        If `None`, then one output is returned for each overlapping
+        polygon and pixel, in the order of the input polygons. If
+        ``'pixel'``, then the outputs are aggregated by pixel: one
+        output is returned for each unique pixel, with the summed
+        overlapping area of all polygons and the number of polygons
+        that overlap it (instead of the ``slices``). The unique pixels
+        are sorted by ``yy`` and then ``xx``. The default is `None`.
+
+    index : bool, optional
+        If `True`, then a single array of linear pixel indices
+        (``yy * nxy[0] + xx``) is returned instead of the ``xx`` and
+        ``yy`` arrays. The default is `False`.
+
+    area_dtype : {`np.float32`, `np.float16`, `np.uint16`}, optional
+        The data type of the output ``areas``. `np.float16` areas have a
+        relative error of at most 2**-11 or an absolute error of at most
+        2**-25 (~3e-8), whichever is larger, as areas smaller than ~6e-5
+        are subnormal (areas smaller than ~3e-8 are rounded to zero).
+        `np.uint16` areas are quantized as ``round(area
+        * 65535)``, with an absolute error of at most 1 / (2 * 65535);
+        use `decode_areas` to convert them back to floats. `np.uint16`
+        cannot be used with ``aggregate='pixel'``, as the summed areas
+        can exceed 1. The default is `np.float32`.
+
+    executor : {None, 'process'}, optional
+        If `None`, then the polygons are clipped in the current process.
+        If ``'process'``, then the polygons are split into ``workers``
+        groups with a similar number of bounding-box pixels, which are
+        clipped in parallel by a pool of worker processes. The default
+        is `None`.
+
+    workers : int or `None`, optional
+        The (positive) number of worker processes. It can only be used
+        with ``executor='process'``. If `None`, then the number of CPUs
+        is used. The default is `None`.
+
+    stats : bool, optional
+        If `True`, then a dictionary of the clipping statistics (the
+        number of visited, clipped, and degenerate pixels and the time
+        spent in each stage) will also be returned. See
+        `~pypolyclip.profile` for a description of the statistics. The
+        default is `False`.
+
     Returns
     -------
     xx : 2D `np.ndarray` of int
@@ -41,13 +497,27 @@ def clip_multi(x, y, nxy):
         The y-pixel indices that have overlapping area. Each row
         represents a separate polygon.
 
-    areas : 1D `np.ndarray` of float
-        The overlapping area on a given pixel.
+    index : 1D `np.ndarray` of int
+        The linear pixel indices (``yy * nxy[0] + xx``) that have
+        overlapping area. The data type is `np.int32` if the number of
+        grid pixels allows it, otherwise `np.int64`. Returned instead of
+        ``xx`` and ``yy`` if ``index=True``.
+
+    areas : 1D `np.ndarray` of float or uint16
+        The overlapping area on a given pixel, with a data type of
+        ``area_dtype``.
 
     slices : list of slice objects
         A list of slice objects that maps between the input and output
         coordinates. The length of the list is equal to the number of
-        input polygons.
+        input polygons. Only returned if ``aggregate=None``.
+
+    counts : 1D `np.ndarray` of int
+        The number of polygons that overlap a given pixel. Only returned
+        if ``aggregate='pixel'``.
+
+    stats : dict
+        The clipping statistics. Only returned if ``stats=True``.
 
     Notes
     -----
@@ -67,6 +537,39 @@ def clip_multi(x, y, nxy):
     same length. However, ``slices`` will have the same length as the
     number of input polygons.
 
+    Aggregating the outputs by pixel (e.g., for overlapping dithered
+    footprints) is performed in the C code by sorting the outputs on
+    their linear pixel index, which is faster and requires less memory
+    than aggregating them afterward with `np.unique`.
+
+    With ``index=True`` and ``area_dtype=np.uint16`` (or
+    `np.float16`), each output pixel takes 6 bytes (instead of 12) for
+    grids with fewer than 2**31 pixels. The outputs can be directly
+    passed to `np.bincount` to make an image, e.g.::
+
+        >>> img = np.bincount(index, weights=decode_areas(areas),
+        ...                   minlength=nxy[0] * nxy[1])
+        >>> img = img.reshape(nxy[1], nxy[0])
+
+    With ``executor='process'``, the input vertices and the output
+    arrays are placed in shared memory (see
+    `multiprocessing.shared_memory`), so that the worker processes
+    write their outputs directly into the output arrays and no large
+    arrays are pickled. The worker processes are started with the
+    ``'forkserver'`` (or ``'spawn'``, if unavailable) start method, so
+    scripts that use it must protect their entry point with ``if
+    __name__ == '__main__':``. Starting the processes has an overhead,
+    so this is only faster for large numbers of polygons. The outputs
+    are identical to those with ``executor=None``. The time spent
+    allocating the outputs is included in the ``'time_clip'``
+    statistic.
+
+    To keep the linear pixel indices unambiguous, the pixels outside of
+    the grid are excluded if ``index=True``. Otherwise, the pixels
+    along the top and right edges of the grid (i.e., ``xx == nxy[0]``
+    or ``yy == nxy[1]``) may be included for polygons that extend
+    beyond the grid.
+
     If ``x`` and ``y`` are input as a list or tuple, then they are
     assumed to be a list of polygons, which can have an arbitrary number
     of vertices. If ``x`` and ``y`` are input as `~np.array` objects,
@@ -74,68 +577,86 @@ def clip_multi(x, y, nxy):
     vertices. In that case, NumPy vectorization can be used to improve
     performance.
     """
-    # must find the bounding boxes for each pixel
-    if isinstance(x, np.ndarray) and isinstance(y, np.ndarray):
-        # if here, then the inputs are numpy arrays, and so the polygons
-        # all have the same number of vertices.  Therefore, we can use
-        # numpy operations to do many calculations
-        l = np.clip(np.floor(np.amin(x, axis=1)), 0, nxy[0]).astype(INT)  # noqa: E741
-        r = np.clip(np.floor(np.amax(x, axis=1)), 0, nxy[0]).astype(INT)
-        b = np.clip(np.floor(np.amin(y, axis=1)), 0, nxy[1]).astype(INT)
-        t = np.clip(np.floor(np.amax(y, axis=1)), 0, nxy[1]).astype(INT)
+    area_dtype = _validate_options(aggregate, area_dtype, executor,
+                                   workers)
 
-        # make some polygon indices
-        npoly = x.shape[0]
-        indices = np.linspace(0, x.size, npoly + 1, dtype=INT)
-    elif isinstance(x, (tuple, list)) and isinstance(y, (tuple, list)):
-        # if here, then the inputs are a list, which can permit polygons
-        # to have differing number of vertices (such as a triangle and a
-        # quadrilateral).  Therefore, we must explicitly loop over the
-        # polygons --- which is more costly, but more general.
-        npoly = len(x)
-        l = np.empty(npoly, dtype=INT)  # noqa: E741
-        r = np.empty(npoly, dtype=INT)
-        b = np.empty(npoly, dtype=INT)
-        t = np.empty(npoly, dtype=INT)
-        indices = np.empty(npoly + 1, dtype=INT)
-        indices[0] = 0
-        for i, (_x, _y) in enumerate(zip(x, y, strict=False)):
-            l[i] = np.clip(np.floor(np.amin(_x)), 0, nxy[0])
-            r[i] = np.clip(np.floor(np.amax(_x)), 0, nxy[0])
-            b[i] = np.clip(np.floor(np.amin(_y)), 0, nxy[1])
-            t[i] = np.clip(np.floor(np.amax(_y)), 0, nxy[1])
-            indices[i + 1] = indices[i] + len(_x)
-    else:
-        msg = 'Invalid types for the input polygons.'
-        raise TypeError(msg)
+    # the times at the end of each stage, for the statistics
+    times = [time.perf_counter()]
 
-    # maximum number of pixels that could be affected
-    npix = sum((r - l + 1) * (t - b + 1))
+    # must find the bounding boxes for each pixel (limited to the grid
+    # pixels for linear pixel indices)
+    limits = (nxy[0] - 1, nxy[1] - 1) if index else nxy
+    l, r, b, t, indices = _bounding_boxes(x, y, limits)  # noqa: E741
+    npoly = len(l)
+    times.append(time.perf_counter())
 
-    # the number of output pixels must be an array (this is a C-gotcha)
-    nclip = np.zeros(1, dtype=INT)
+    # the C code requires contiguous float vertices
+    px = np.hstack(x).astype(FLT)
+    py = np.hstack(y).astype(FLT)
+    times.append(time.perf_counter())
 
-    # output arrays
-    areas = np.empty(npix, dtype=FLT)
-    xx = np.empty(npix, dtype=INT)
-    yy = np.empty(npix, dtype=INT)
-
-    # call the compiled C-code
-    polyclip.multi(l, r, b, t,
-                   np.hstack(x).astype(FLT),
-                   np.hstack(y).astype(FLT),
-                   npoly, indices, xx, yy, nclip, areas)
+    # maximum number of pixels that could be affected
+    npix = sum((r - l + 1) * (t - b + 1))
 
-    # create a list of slices objects from returned indices
-    slices = [slice(indices[i], indices[i + 1], 1) for i in range(npoly)]
+    if executor == 'process':
+        # the outputs are allocated in shared memory by the helper
+        times.append(time.perf_counter())
+        xx, yy, areas, nclip, clip_counts = _clip_multi_processes(
+            l, r, b, t, px, py, indices, workers)
+    else:
+        # the number of output pixels must be an array (this is a
+        # C-gotcha)
+        nclip = np.zeros(1, dtype=INT)
+
+        # the number of visited pixels and degenerate clipped polygons
+        clip_counts = np.zeros(2, dtype=np.int64)
+
+        # output arrays
+        areas = np.empty(npix, dtype=FLT)
+        xx = np.empty(npix, dtype=INT)
+        yy = np.empty(npix, dtype=INT)
+        times.append(time.perf_counter())
+
+        # call the compiled C-code
+        polyclip.multi(l, r, b, t, px, py,
+                       npoly, indices, xx, yy, nclip, areas, clip_counts)
+    times.append(time.perf_counter())
+
+    # create a list of slices objects from returned indices (these are
+    # meaningless if the outputs are aggregated by pixel)
+    if aggregate is None:
+        slices = [slice(indices[i], indices[i + 1], 1)
+                  for i in range(npoly)]
+    times.append(time.perf_counter())
 
     # trim the results
     nclip = nclip[0]  # undo that C-gotcha above :(
     areas = areas[:nclip]
     xx = xx[:nclip]
     yy = yy[:nclip]
+    times.append(time.perf_counter())
 
-    return xx, yy, areas, slices
+    if aggregate == 'pixel':
+        xx, yy, areas, counts = _aggregate_pixels(xx, yy, areas, nxy)
+        outputs = (counts,)
+    else:
+        outputs = (slices,)
+    times.append(time.perf_counter())
+
+    # encode the outputs
+    areas = _encode_areas(areas, area_dtype)
+    if index:
+        outputs = (_pixel_index(xx, yy, nxy), areas, *outputs)
+    else:
+        outputs = (xx, yy, areas, *outputs)
+    times.append(time.perf_counter())
+
+    if stats or _PROFILES:
+        clip_stats = _make_stats(times, npoly, npix, nclip, clip_counts)
+        _record(clip_stats)
+        if stats:
+            return *outputs, clip_stats
+    return outputs
 
 
 def clip_single(x, y, nxy, *, return_polygons=False):
@@ -3,6 +3,7 @@
 #include <numpy/npy_no_deprecated_api.h>
 #include <numpy/arrayobject.h>
 #include "polyclip.h"
+#include "aggregate.h"
 
 
 
@@ -32,7 +33,8 @@ static PyObject *_multi(PyObject *self,PyObject *args){
   /* Create objects from the inputs */
   PyObject *lobj,*robj,*bobj,*tobj,*pxobj,*pyobj;
   PyObject *n_polyobj,*poly_indsobj,*xxobj,*yyobj,*nclip_polyobj,*areasobj;
-  if (!PyArg_ParseTuple(args, "OOOOOOOOOOOO",&lobj,&robj,&bobj,&tobj,&pxobj,&pyobj,&n_polyobj,&poly_indsobj,&xxobj,&yyobj,&nclip_polyobj,&areasobj)){
+  PyObject *countsobj;
+  if (!PyArg_ParseTuple(args, "OOOOOOOOOOOOO",&lobj,&robj,&bobj,&tobj,&pxobj,&pyobj,&n_polyobj,&poly_indsobj,&xxobj,&yyobj,&nclip_polyobj,&areasobj,&countsobj)){
     return NULL;
   }
 
@@ -50,6 +52,7 @@ static PyObject *_multi(PyObject *self,PyObject *args){
   PyObject *yyarr=PyArray_FROM_OTF(yyobj,NPY_INT32,NPY_ARRAY_IN_ARRAY);
   PyObject *nclip_polyarr=PyArray_FROM_OTF(nclip_polyobj,NPY_INT32,NPY_ARRAY_IN_ARRAY);
   PyObject *areasarr=PyArray_FROM_OTF(areasobj,NPY_FLOAT32,NPY_ARRAY_IN_ARRAY);
+  PyObject *countsarr=PyArray_FROM_OTF(countsobj,NPY_INT64,NPY_ARRAY_IN_ARRAY);
 
   /* extract the array data to a C variable */
   int *l = (int*)PyArray_DATA((PyArrayObject*)larr);
@@ -64,6 +67,7 @@ static PyObject *_multi(PyObject *self,PyObject *args){
   int *yy = (int*)PyArray_DATA((PyArrayObject*)yyarr);
   int *nclip_poly=(int*)PyArray_DATA((PyArrayObject*)nclip_polyarr);
   float *areas = (float*)PyArray_DATA((PyArrayObject*)areasarr);
+  long long *counts = (long long*)PyArray_DATA((PyArrayObject*)countsarr);
 
   /* clean up memory */
   Py_DECREF(larr);
@@ -78,10 +82,11 @@ static PyObject *_multi(PyObject *self,PyObject *args){
   Py_DECREF(yyarr);
   Py_DECREF(nclip_polyarr);
   Py_DECREF(areasarr);
+  Py_DECREF(countsarr);
 
   /* call function */
   int n=n_poly[0];
-  polyclip_multi(l,r,b,t,px,py,n,poly_inds,xx,yy,nclip_poly,areas);
+  polyclip_multi(l,r,b,t,px,py,n,poly_inds,xx,yy,nclip_poly,areas,&counts[0],&counts[1]);
 
   //printf("C: %f %f\n",px[0],xx[0]);
 
@@ -170,12 +175,81 @@ static PyObject *_single(PyObject *self,PyObject *args){
 
 
 
+static PyObject *_aggregate(PyObject *self,PyObject *args){
+  /* Function to link to the polyclip_aggregate function */
+
+  /* Create objects from the inputs */
+  PyObject *nobj,*nxobj,*xxobj,*yyobj,*areasobj;
+  if(!PyArg_ParseTuple(args,"OOOOO",&nobj,&nxobj,&xxobj,&yyobj,&areasobj)){
+    return NULL;
+  }
+
+  /* if arrays, then extract them to objects */
+  PyObject *narr=PyArray_FROM_OTF(nobj,NPY_INT32,NPY_ARRAY_IN_ARRAY);
+  PyObject *nxarr=PyArray_FROM_OTF(nxobj,NPY_INT32,NPY_ARRAY_IN_ARRAY);
+  PyObject *xxarr=PyArray_FROM_OTF(xxobj,NPY_INT32,NPY_ARRAY_IN_ARRAY);
+  PyObject *yyarr=PyArray_FROM_OTF(yyobj,NPY_INT32,NPY_ARRAY_IN_ARRAY);
+  PyObject *areasarr=PyArray_FROM_OTF(areasobj,NPY_FLOAT32,NPY_ARRAY_IN_ARRAY);
+
+  /* extract the array data to a C variable */
+  int *n = (int*)PyArray_DATA((PyArrayObject*)narr);
+  int *nx = (int*)PyArray_DATA((PyArrayObject*)nxarr);
+  int *xx = (int*)PyArray_DATA((PyArrayObject*)xxarr);
+  int *yy = (int*)PyArray_DATA((PyArrayObject*)yyarr);
+  float *areas = (float*)PyArray_DATA((PyArrayObject*)areasarr);
+
+  /* call function (the outputs are sized to the number of unique
+     pixels, which is only known after the sorting) */
+  aggregate_t agg;
+  int status=polyclip_aggregate(n[0],nx[0],xx,yy,areas,&agg);
+  int nxval=nx[0];
+
+  /* clean up memory */
+  Py_DECREF(narr);
+  Py_DECREF(nxarr);
+  Py_DECREF(xxarr);
+  Py_DECREF(yyarr);
+  Py_DECREF(areasarr);
+
+  if(status!=0){
+    return PyErr_NoMemory();
+  }
+
+  /* create the output arrays */
+  npy_intp dims[1]={agg.nuniq};
+  PyObject *xx_outarr=PyArray_SimpleNew(1,dims,NPY_INT32);
+  PyObject *yy_outarr=PyArray_SimpleNew(1,dims,NPY_INT32);
+  PyObject *areas_outarr=PyArray_SimpleNew(1,dims,NPY_FLOAT32);
+  PyObject *counts_outarr=PyArray_SimpleNew(1,dims,NPY_INT32);
+  if(xx_outarr==NULL || yy_outarr==NULL || areas_outarr==NULL || counts_outarr==NULL){
+    Py_XDECREF(xx_outarr);
+    Py_XDECREF(yy_outarr);
+    Py_XDECREF(areas_outarr);
+    Py_XDECREF(counts_outarr);
+    polyclip_aggregate_free(&agg);
+    return NULL;
+  }
+
+  polyclip_aggregate_copy(&agg,nxval,
+			  (int*)PyArray_DATA((PyArrayObject*)xx_outarr),
+			  (int*)PyArray_DATA((PyArrayObject*)yy_outarr),
+			  (float*)PyArray_DATA((PyArrayObject*)areas_outarr),
+			  (int*)PyArray_DATA((PyArrayObject*)counts_outarr));
+  polyclip_aggregate_free(&agg);
+
+  return Py_BuildValue("NNNN",xx_outarr,yy_outarr,areas_outarr,counts_outarr);
+}
+
+
+
+
 /* Collection of function names */
 static PyMethodDef module_methods[]={
   { "multi", (PyCFunction)_multi, METH_NOARGS,NULL },
   { "multi", _multi, METH_VARARGS, "A python driver to call polyclip_multi.\nA function written by J.D. Smith\n"},
   { "single", (PyCFunction)_single, METH_NOARGS,NULL },
   { "single", _single, METH_VARARGS, "A python driver to call polyclip_single.\nA function written by J.D. Smith\n"},
+  { "aggregate", _aggregate, METH_VARARGS, "A python driver to call polyclip_aggregate.\n"},
   { NULL, NULL, 0, NULL }
 };
 
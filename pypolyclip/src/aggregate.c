@@ -0,0 +1,145 @@
+/*
+NAME:
+
+  POLYCLIP_AGGREGATE
+
+DESCRIPTION:
+
+  Aggregates the outputs of POLYCLIP_MULTI by pixel.  The (xx,yy,area)
+  entries are sorted by their linear pixel index (yy*(nx+1)+xx) using
+  a stable least-significant-digit radix sort, then the areas of the
+  entries that fall on the same pixel are summed (in double precision)
+  and the number of contributing polygons is counted.
+
+  The linear index uses a width of nx+1, because the bounding boxes in
+  pypolyclip are clipped to [0,nx] (inclusive) and so the pixel indices
+  may equal nx.
+
+INPUTS:
+
+  n: The number of input entries (i.e., nclip_poly).
+
+  nx: The size of the pixel grid along the x axis.
+
+  xx, yy, areas: The x and y pixel indices and the areas output by
+    POLYCLIP_MULTI.  These are not modified.
+
+OUTPUTS:
+
+  agg: The unique pixels, ordered by linear pixel index.  The linear
+    pixel indices, the summed areas, and the number of contributing
+    polygons are stored in buffers that are allocated here and are
+    trimmed to the number of unique pixels (agg->nuniq).  The sorting is
+    done in scratch buffers that are reused for these outputs, so the
+    peak memory is 24 bytes per input entry.  Use
+    POLYCLIP_AGGREGATE_COPY to copy the outputs to the caller's arrays
+    and POLYCLIP_AGGREGATE_FREE to free the buffers.
+
+RETURNS:
+
+  0 on success or -1 if the memory could not be allocated (in which
+  case nothing is left allocated).
+
+*/
+
+#include <stdlib.h>
+#include <string.h>
+#include "aggregate.h"
+
+#define RADIX_BITS 11
+#define RADIX_SIZE (1<<RADIX_BITS)
+
+int polyclip_aggregate(int n,int nx,int *xx,int *yy,float *areas,
+		       aggregate_t *agg){
+  unsigned long long *key,*key_tmp,*key_swap,max_key;
+  int *idx,*idx_tmp,*idx_swap;
+  double *area_out;
+  int *count_out;
+  void *ptr;
+  size_t count[RADIX_SIZE];
+  size_t pos,total;
+  int i,k,shift;
+  double area;
+
+  agg->key=NULL; agg->area=NULL; agg->count=NULL; agg->nuniq=0;
+  if(n<=0) return 0;
+
+  key=(unsigned long long *)malloc(n*sizeof(unsigned long long));
+  key_tmp=(unsigned long long *)malloc(n*sizeof(unsigned long long));
+  idx=(int *)malloc(n*sizeof(int));
+  idx_tmp=(int *)malloc(n*sizeof(int));
+  if(key==NULL || key_tmp==NULL || idx==NULL || idx_tmp==NULL) {
+    free(key); free(key_tmp); free(idx); free(idx_tmp);
+    return -1;
+  }
+
+  /* Compute the linear pixel indices */
+  for(max_key=0,i=0;i<n;i++) {
+    key[i]=(unsigned long long)yy[i]*(nx+1)+xx[i];
+    if(key[i]>max_key) max_key=key[i];
+    idx[i]=i;
+  }
+
+  /* Radix sort, only for as many digits as the largest index needs */
+  for(shift=0;shift<64 && (max_key>>shift)>0;shift+=RADIX_BITS) {
+    memset(count,0,sizeof(count));
+    for(i=0;i<n;i++) count[(key[i]>>shift)&(RADIX_SIZE-1)]++;
+    for(total=0,k=0;k<RADIX_SIZE;k++) {
+      pos=count[k]; count[k]=total; total+=pos;
+    }
+    for(i=0;i<n;i++) {
+      pos=count[(key[i]>>shift)&(RADIX_SIZE-1)]++;
+      key_tmp[pos]=key[i]; idx_tmp[pos]=idx[i];
+    }
+    key_swap=key; key=key_tmp; key_tmp=key_swap;
+    idx_swap=idx; idx=idx_tmp; idx_tmp=idx_swap;
+  }
+
+  /* Sum the areas of the runs of equal pixel indices, writing the
+     unique pixels in place (k<=i) to the front of the sorted keys and
+     to the (no longer needed) scratch buffers */
+  area_out=(double *)key_tmp;
+  count_out=idx_tmp;
+  for(k=-1,area=0.0,i=0;i<n;i++) {
+    if(i==0 || key[i]!=key[i-1]) {
+      if(k>=0) area_out[k]=area;
+      k++;
+      key[k]=key[i];
+      count_out[k]=0;
+      area=0.0;
+    }
+    area+=areas[idx[i]];
+    count_out[k]++;
+  }
+  area_out[k]=area;
+  free(idx);
+
+  /* Release the unused ends of the buffers (keeping the full buffers
+     if they cannot be shrunk) */
+  agg->nuniq=k+1;
+  ptr=realloc(key,agg->nuniq*sizeof(unsigned long long));
+  agg->key=(ptr==NULL) ? key : (unsigned long long *)ptr;
+  ptr=realloc(area_out,agg->nuniq*sizeof(double));
+  agg->area=(ptr==NULL) ? area_out : (double *)ptr;
+  ptr=realloc(count_out,agg->nuniq*sizeof(int));
+  agg->count=(ptr==NULL) ? count_out : (int *)ptr;
+
+  return 0;
+}
+
+void polyclip_aggregate_copy(aggregate_t *agg,int nx,int *xx_out,
+			     int *yy_out,float *areas_out,int *counts_out){
+  int k;
+
+  for(k=0;k<agg->nuniq;k++) {
+    xx_out[k]=(int)(agg->key[k]%(nx+1));
+    yy_out[k]=(int)(agg->key[k]/(nx+1));
+    areas_out[k]=(float)agg->area[k];
+    counts_out[k]=agg->count[k];
+  }
+}
+
+void polyclip_aggregate_free(aggregate_t *agg){
+  free(agg->key); free(agg->area); free(agg->count);
+  agg->key=NULL; agg->area=NULL; agg->count=NULL; agg->nuniq=0;
+}
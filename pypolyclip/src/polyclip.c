@@ -108,6 +108,12 @@ OUTPUTS:
     themselves cannot be output by POLYCLIP_MULTIPLE.  Also serves as
     an input argument (see above).
 
+  nvisit: The total number of pixels visited (i.e., the number of
+    pixels in all of the bounding boxes).  Added by pypolyclip.
+
+  ndegen: The total number of degenerate (zero-area) clipped polygons,
+    which are discarded from the output.  Added by pypolyclip.
+
 
 EXAMPLE:
 
@@ -205,7 +211,8 @@ void polyclip_single(int l,int r,int b,int t,float *px,float *py,int nverts,int
 
 void polyclip_multi(int *l,int *r, int *b, int *t,float*px,float*py,
 		    int n_poly,int *poly_inds,int*xx,int*yy,
-		    int*nclip_poly,float*areas){
+		    int*nclip_poly,float*areas,long long*nvisit,
+		    long long*ndegen){
   int i,j,k,nv_clip,index;
   //float *px,*py,*px_out,*py_out,*areas,area;
   float *px_out,*py_out,area;
@@ -213,6 +220,7 @@ void polyclip_multi(int *l,int *r, int *b, int *t,float*px,float*py,
   //  unsigned int *poly_inds;
   //int *nclip_poly, nverts, this_nclip_poly, prev_pind, nv_max;
   int nverts, this_nclip_poly, prev_pind, nv_max;
+  long long this_nvisit, this_ndegen; /* Added by pypolyclip */
 
   /* Input */
   //  l=(int *)argv[0]; r=(int *)argv[1]; b=(int *)argv[2]; t=(int *)argv[3];
@@ -242,9 +250,11 @@ void polyclip_multi(int *l,int *r, int *b, int *t,float*px,float*py,
 
 
   /* Clip each polygon and accumulate results */
-  for(index=0,prev_pind=0,k=0;k<n_poly;k++) {
+  for(this_nvisit=0,this_ndegen=0,index=0,prev_pind=0,k=0;k<n_poly;k++) {
     nverts=poly_inds[k+1]-prev_pind;
     this_nclip_poly=0;
+    if(r[k]>=l[k] && t[k]>=b[k])
+      this_nvisit+=(long long)(r[k]-l[k]+1)*(t[k]-b[k]+1);
     for(i=l[k];i<=r[k];i++) {
       for(j=b[k];j<=t[k];j++) {
 	if((nv_clip=polyclip(px,py,nverts,i,j,px_out,py_out))) {
@@ -254,7 +264,10 @@ void polyclip_multi(int *l,int *r, int *b, int *t,float*px,float*py,
 	  for(int rr=0;rr<nv_clip;rr++) printf("%f %f\n",px_out[rr],py_out[rr]);
 	  printf("area: %f\n",area);
 	  printf("\n\n\n");*/
-	  if (area==0.0) continue; /* Discard degenerates */
+	  if (area==0.0) {	/* Discard degenerates */
+	    this_ndegen++;
+	    continue;
+	  }
 	  areas[index]=area;
 	  this_nclip_poly++;
 	  //	  inds[2*index]=i;
@@ -271,7 +284,7 @@ void polyclip_multi(int *l,int *r, int *b, int *t,float*px,float*py,
     px+=nverts; py+=nverts;	/* Offset to next input poly */
   }
   free(px_out); free(py_out);
-
+  (*nvisit)+=this_nvisit; (*ndegen)+=this_ndegen; /* Clipping statistics */
 
 }
 
@@ -0,0 +1,168 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Tests for the overlaps module.
+"""
+import numpy as np
+import pytest
+
+from pypolyclip import clip_multi, clip_multi_cached, profile
+from pypolyclip.overlaps import load_overlaps, polygon_hash, save_overlaps
+
+NAXIS = (30, 20)
+
+PX = np.array([[3.4, 3.4, 4.4, 4.4], [5.8, 6.2, 6.3, 5.6],
+               [8.0, 8.0, 9.0, 9.0], [5.8, 5.8, 7.2, 7.2]])
+PY = np.array([[1.4, 1.9, 1.9, 1.4], [1.5, 1.8, 2.4, 1.9],
+               [8.0, 8.0, 9.0, 9.0], [3.8, 5.2, 5.2, 3.8]])
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+@pytest.mark.parametrize('area_dtype', [np.float32, np.uint16])
+def test_save_load_overlaps(tmp_path, mmap, area_dtype):
+    """
+    Test saving and loading overlaps with linear pixel indices.
+    """
+    result = clip_multi(PX, PY, NAXIS, index=True, area_dtype=area_dtype)
+    key = polygon_hash(PX, PY, NAXIS)
+
+    path = tmp_path / 'test.overlaps'
+    save_overlaps(path, result, NAXIS, key=key)
+    index, areas, slices, header = load_overlaps(path, mmap=mmap,
+                                                 return_header=True)
+
+    assert isinstance(index, np.memmap) == mmap
+    assert index.dtype == result[0].dtype
+    assert areas.dtype == area_dtype
+    assert np.array_equal(index, result[0])
+    assert np.array_equal(areas, result[1])
+    assert slices == result[2]
+    assert header['nxy'] == list(NAXIS)
+    assert header['key'] == key
+
+    # the arrays are aligned within the file
+    data = path.read_bytes()
+    start = 12 + int(np.frombuffer(data[8:12], dtype='<u4')[0])
+    start = -(-start // 64) * 64
+    layout = header['arrays']['areas']
+    assert (start + layout['offset']) % 64 == 0
+    nbytes = areas.size * areas.itemsize
+    offset = start + layout['offset']
+    assert data[offset:offset + nbytes] == result[1].tobytes()
+
+
+def test_save_overlaps_xy(tmp_path):
+    """
+    Test saving overlaps with x and y pixel indices.
+    """
+    xx, yy, areas, slices = clip_multi(PX, PY, NAXIS)
+    path = tmp_path / 'test.overlaps'
+    save_overlaps(path, (xx, yy, areas, slices), NAXIS)
+
+    index, areas1, slices1 = load_overlaps(path)
+    assert np.array_equal(index, yy * NAXIS[0] + xx)
+    assert np.array_equal(areas1, areas)
+    assert slices1 == slices
+
+    # pixels outside of the grid cannot be saved
+    px = np.array([[28.5, 28.5, 31.5, 31.5]])
+    py = np.array([[1.5, 2.5, 2.5, 1.5]])
+    result = clip_multi(px, py, NAXIS)
+    match = 'Pixels outside of the grid'
+    with pytest.raises(ValueError, match=match):
+        save_overlaps(path, result, NAXIS)
+
+
+def test_save_load_overlaps_empty(tmp_path):
+    """
+    Test saving and loading overlaps without any overlapping pixels.
+    """
+    result = clip_multi(PX[2:3], PY[2:3], NAXIS, index=True)
+    assert len(result[0]) == 0
+
+    path = tmp_path / 'test.overlaps'
+    save_overlaps(path, result, NAXIS)
+    index, areas, slices = load_overlaps(path)
+    assert len(index) == len(areas) == 0
+    assert slices == [slice(0, 0, 1)]
+
+
+@pytest.mark.parametrize('kwargs', [{'aggregate': 'pixel'},
+                                    {'aggregate': 'pixel', 'index': True}])
+def test_save_overlaps_aggregate(tmp_path, kwargs):
+    """
+    Test that aggregated overlaps cannot be saved.
+    """
+    result = clip_multi(PX, PY, NAXIS, **kwargs)
+    match = 'Cannot save clip_multi results without slices'
+    with pytest.raises(ValueError, match=match):
+        save_overlaps(tmp_path / 'test.overlaps', result, NAXIS)
+
+
+@pytest.mark.parametrize('index', [True, False])
+def test_save_overlaps_stats(tmp_path, index):
+    """
+    Test that overlaps with statistics cannot be saved.
+    """
+    result = clip_multi(PX, PY, NAXIS, index=index, stats=True)
+    match = 'Cannot save clip_multi results with stats'
+    with pytest.raises(ValueError, match=match):
+        save_overlaps(tmp_path / 'test.overlaps', result, NAXIS)
+
+
+def test_load_overlaps_invalid(tmp_path):
+    """
+    Test loading an invalid overlaps file.
+    """
+    path = tmp_path / 'test.overlaps'
+    path.write_bytes(b'not an overlaps file')
+    match = 'Not a pypolyclip overlaps file'
+    with pytest.raises(ValueError, match=match):
+        load_overlaps(path)
+
+
+def test_polygon_hash():
+    """
+    Test the polygon hash.
+    """
+    key = polygon_hash(PX, PY, NAXIS)
+    assert key == polygon_hash(list(PX), list(PY), NAXIS)
+    assert key != polygon_hash(PX, PY, (NAXIS[0], NAXIS[1] + 1))
+    assert key != polygon_hash(PX + 0.01, PY, NAXIS)
+    assert key != polygon_hash(PX[:, :3], PY[:, :3], NAXIS)
+
+    match = 'Invalid types for the input polygons'
+    with pytest.raises(TypeError, match=match):
+        polygon_hash(PX, list(PY), NAXIS)
+
+
+def test_clip_multi_cached(tmp_path):
+    """
+    Test clipping with cached overlaps.
+    """
+    cache_dir = tmp_path / 'cache'
+    result = clip_multi(PX, PY, NAXIS, index=True)
+
+    with profile() as stats:
+        result1 = clip_multi_cached(PX, PY, NAXIS, cache_dir)
+        assert stats['ncalls'] == 1
+
+        # the geometry is unchanged, so the clipping is skipped
+        result2 = clip_multi_cached(PX, PY, NAXIS, cache_dir)
+        assert stats['ncalls'] == 1
+
+        # a different area data type is cached separately
+        result3 = clip_multi_cached(PX, PY, NAXIS, cache_dir,
+                                    area_dtype=np.uint16)
+        assert stats['ncalls'] == 2
+
+        # the geometry has changed
+        clip_multi_cached(PX + 0.5, PY, NAXIS, cache_dir)
+        assert stats['ncalls'] == 3
+
+    assert len(list(cache_dir.iterdir())) == 3
+    assert isinstance(result2[0], np.memmap)
+    assert result3[1].dtype == np.uint16
+    for res in (result1, result2):
+        assert np.array_equal(res[0], result[0])
+        assert np.array_equal(res[1], result[1])
+        assert res[2] == result[2]
@@ -7,7 +7,7 @@ import numpy as np
 import pytest
 from matplotlib.patches import Polygon
 
-from pypolyclip import clip_multi, clip_single
+from pypolyclip import clip_multi, clip_single, decode_areas, profile
 
 
 def test_clip_multi_numpy(*, plot=False):
@@ -104,6 +104,287 @@ def test_clip_multi_invalid_input():
         clip_multi(px, py, naxis)
 
 
+def test_clip_multi_aggregate():
+    """
+    Test aggregating the clipped pixels.
+    """
+    naxis = (100, 100)
+
+    # dithered copies of a rotated square and of a triangle
+    rng = np.random.default_rng(0)
+    xx, yy = _polygon(4, radius=1.5, x0=10.2, y0=20.7, theta0=17.0)
+    px = [np.add(xx, dx) for dx in rng.uniform(-1, 1, 20)]
+    py = [np.add(yy, dy) for dy in rng.uniform(-1, 1, 20)]
+    px.append([50.3, 52.1, 50.3])
+    py.append([40.3, 40.3, 42.9])
+
+    xc, yc, area, _ = clip_multi(px, py, naxis)
+    xc1, yc1, area1, counts1 = clip_multi(px, py, naxis, aggregate='pixel')
+
+    # compare to aggregating the outputs with numpy
+    index = yc.astype(np.int64) * (naxis[0] + 1) + xc
+    uindex, inverse, counts = np.unique(index, return_inverse=True,
+                                        return_counts=True)
+    assert len(xc1) < len(xc)
+    assert np.array_equal(xc1, xc[np.unique(inverse, return_index=True)[1]])
+    assert np.array_equal(yc1 * (naxis[0] + 1) + xc1, uindex)
+    assert np.allclose(area1, np.bincount(inverse, weights=area))
+    assert np.array_equal(counts1, counts)
+    assert np.isclose(np.sum(area1), np.sum(area))
+
+
+def test_clip_multi_aggregate_empty():
+    """
+    Test aggregating the clipped pixels when no pixels overlap.
+    """
+    px = np.array([[8.0, 8.0, 9.0, 9.0]])
+    py = np.array([[8.0, 8.0, 9.0, 9.0]])
+    xc, yc, area, counts = clip_multi(px, py, (100, 100),
+                                      aggregate='pixel')
+    assert len(xc) == len(yc) == len(area) == len(counts) == 0
+
+
+def test_clip_multi_aggregate_invalid():
+    """
+    Test invalid aggregate values.
+    """
+    px = np.array([[3.4, 3.4, 4.4, 4.4]])
+    py = np.array([[1.4, 1.9, 1.9, 1.4]])
+    match = 'Invalid aggregate value'
+    with pytest.raises(ValueError, match=match):
+        clip_multi(px, py, (100, 100), aggregate='polygon')
+
+
+def test_clip_multi_index():
+    """
+    Test returning linear pixel indices and compact areas.
+    """
+    naxis = (30, 20)
+
+    # the last polygon extends beyond the top-right corner of the grid
+    px = np.array([[3.4, 3.4, 4.4, 4.4], [5.8, 6.2, 6.3, 5.6],
+                   [28.5, 28.5, 31.5, 31.5]])
+    py = np.array([[1.4, 1.9, 1.9, 1.4], [1.5, 1.8, 2.4, 1.9],
+                   [18.5, 21.5, 21.5, 18.5]])
+
+    xc, yc, area, slices = clip_multi(px, py, naxis)
+    index, area1, slices1 = clip_multi(px, py, naxis, index=True)
+
+    # the pixels outside of the grid are excluded
+    mask = (xc < naxis[0]) & (yc < naxis[1])
+    assert not np.all(mask)
+    assert index.dtype == np.int32
+    assert np.array_equal(index, yc[mask] * naxis[0] + xc[mask])
+    assert np.array_equal(area1, area[mask])
+    assert slices1[:2] == slices[:2]
+    assert slices1[2] == slice(slices[2].start, len(index), 1)
+
+    image = np.bincount(index, weights=area1, minlength=np.prod(naxis))
+    image = image.reshape(naxis[::-1])
+    assert np.isclose(np.sum(image[18:, 28:]), 2.25)
+
+    # large grids need 64-bit indices
+    index, _, _ = clip_multi(px, py, (2**16, 2**16), index=True)
+    assert index.dtype == np.int64
+
+    _, _, area2, _ = clip_multi(px, py, naxis, area_dtype=np.uint16)
+    assert area2.dtype == np.uint16
+    assert np.allclose(decode_areas(area2), area, rtol=0, atol=0.5 / 65535)
+
+    _, _, area3, _ = clip_multi(px, py, naxis, area_dtype='float16')
+    assert area3.dtype == np.float16
+    assert np.allclose(decode_areas(area3), area, rtol=2**-11, atol=0)
+    assert decode_areas(area3).dtype == np.float32
+
+    # small (subnormal) float16 areas have a larger relative error
+    px = np.array([[3.0, 3.0, 3.0001, 3.0001],
+                   [5.0, 5.0, 5.00001, 5.00001]])
+    py = np.array([[1.2, 1.7, 1.7, 1.2], [1.2, 1.4, 1.4, 1.2]])
+    _, _, area, _ = clip_multi(px, py, naxis)
+    _, _, area4, _ = clip_multi(px, py, naxis, area_dtype=np.float16)
+    assert np.all(area < 6.1e-5)
+    assert not np.allclose(decode_areas(area4), area, rtol=2**-11, atol=0)
+    assert np.allclose(decode_areas(area4), area, rtol=2**-11, atol=2**-25)
+
+
+def test_clip_multi_index_aggregate():
+    """
+    Test aggregating the clipped pixels with linear pixel indices.
+    """
+    naxis = (30, 20)
+    px = [[3.4, 3.4, 4.4, 4.4], [3.5, 3.5, 4.3, 4.3], [3.1, 3.9, 3.1]]
+    py = [[1.4, 1.9, 1.9, 1.4], [1.7, 2.4, 2.4, 1.7], [1.1, 1.1, 2.9]]
+
+    xc, yc, area, counts = clip_multi(px, py, naxis, aggregate='pixel')
+    index, area1, counts1 = clip_multi(px, py, naxis, aggregate='pixel',
+                                       index=True, area_dtype=np.float16)
+
+    assert np.array_equal(index, yc * naxis[0] + xc)
+    assert np.all(np.diff(index) > 0)
+    assert np.allclose(area1, area, rtol=2**-11, atol=0)
+    assert np.array_equal(counts1, counts)
+
+    match = 'cannot be used with aggregate'
+    with pytest.raises(ValueError, match=match):
+        clip_multi(px, py, naxis, aggregate='pixel', area_dtype=np.uint16)
+
+    match = 'Invalid area_dtype'
+    with pytest.raises(ValueError, match=match):
+        clip_multi(px, py, naxis, area_dtype=np.float64)
+
+
+def test_clip_multi_stats():
+    """
+    Test the clipping statistics returned by clip_multi.
+    """
+    naxis = (100, 100)
+
+    # a square, a degenerate (zero-area) square, and a triangle whose
+    # bounding box has an empty pixel
+    px = [[3.4, 3.4, 4.4, 4.4], [8.0, 8.0, 9.0, 9.0], [5.1, 6.8, 5.1]]
+    py = [[1.4, 1.9, 1.9, 1.4], [8.0, 8.0, 9.0, 9.0], [5.1, 5.1, 6.8]]
+
+    xc, yc, area, slices = clip_multi(px, py, naxis)
+    xc1, yc1, area1, slices1, stats = clip_multi(px, py, naxis, stats=True)
+
+    # the statistics must not change the outputs
+    assert np.array_equal(xc, xc1)
+    assert np.array_equal(yc, yc1)
+    assert np.array_equal(area, area1)
+    assert slices == slices1
+
+    assert stats['ncalls'] == 1
+    assert stats['npoly'] == 3
+    assert stats['npix_allocated'] == 10
+    assert stats['npix_visited'] == 10
+    assert stats['npix_clipped'] == len(area) == 5
+    assert stats['npix_degenerate'] == 4
+    assert stats['npix_empty'] == 1
+    assert stats['overallocation'] == 2.0
+    stages = ('bbox', 'hstack', 'allocate', 'clip', 'slices', 'trim',
+              'aggregate', 'encode')
+    times = [stats[f'time_{stage}'] for stage in stages]
+    assert all(time >= 0 for time in times)
+    assert np.isclose(sum(times), stats['time_total'])
+
+
+def test_profile():
+    """
+    Test collecting clipping statistics with the profile context.
+    """
+    naxis = (100, 100)
+    px = np.array([[3.4, 3.4, 4.4, 4.4], [3.5, 3.5, 4.3, 4.3]])
+    py = np.array([[1.4, 1.9, 1.9, 1.4], [3.7, 4.4, 4.4, 3.7]])
+
+    with profile() as stats:
+        assert stats['ncalls'] == 0
+        assert stats['overallocation'] == np.inf
+
+        clip_multi(px, py, naxis)
+        _, _, _, _, stats1 = clip_multi(list(px), list(py), naxis,
+                                        stats=True)
+
+        with profile() as stats2:
+            clip_multi(px, py, naxis)
+
+    # calls outside the context are not collected
+    clip_multi(px, py, naxis)
+
+    assert stats['ncalls'] == 3
+    assert stats2['ncalls'] == 1
+    for key in ('npoly', 'npix_visited', 'npix_clipped'):
+        assert stats[key] == 3 * stats1[key]
+        assert stats2[key] == stats1[key]
+    assert stats['overallocation'] == stats1['overallocation']
+    assert stats['time_total'] > stats2['time_total']
+
+
+def test_profile_nested():
+    """
+    Test nested profile contexts with equal statistics.
+    """
+    px = np.array([[3.4, 3.4, 4.4, 4.4]])
+    py = np.array([[1.4, 1.9, 1.9, 1.4]])
+
+    with profile() as stats:
+        with profile() as stats2:
+            pass
+        clip_multi(px, py, (100, 100))
+
+    assert stats['ncalls'] == 1
+    assert stats2['ncalls'] == 0
+
+
+@pytest.mark.parametrize('kind', ['array', 'list'])
+@pytest.mark.parametrize('workers', [1, 3])
+def test_clip_multi_process(kind, workers):
+    """
+    Test clipping with a pool of worker processes.
+    """
+    naxis = (100, 100)
+    rng = np.random.default_rng(0)
+    xx, yy = _polygon(4, radius=1.5, x0=10.2, y0=20.7, theta0=17.0)
+    px = np.add(xx, rng.uniform(0, 80, (50, 1)))
+    py = np.add(yy, rng.uniform(0, 80, (50, 1)))
+
+    # add a degenerate (zero-area) square
+    px[5] = [8.0, 8.0, 9.0, 9.0]
+    py[5] = [8.0, 8.0, 9.0, 9.0]
+    if kind == 'list':
+        px = list(px)
+        py = list(py)
+
+    result = clip_multi(px, py, naxis, stats=True)
+    result1 = clip_multi(px, py, naxis, executor='process',
+                         workers=workers, stats=True)
+    for array, array1 in zip(result[:3], result1[:3], strict=True):
+        assert np.array_equal(array, array1)
+        assert array.dtype == array1.dtype
+    assert result[3] == result1[3]
+
+    stats, stats1 = result[4], result1[4]
+    for key in ('npoly', 'npix_allocated', 'npix_visited', 'npix_clipped',
+                'npix_degenerate', 'npix_empty'):
+        assert stats[key] == stats1[key]
+
+    # the options are applied to the gathered outputs
+    index, area, counts = clip_multi(px, py, naxis, aggregate='pixel',
+                                     index=True)
+    index1, area1, counts1 = clip_multi(px, py, naxis, aggregate='pixel',
+                                        index=True, executor='process',
+                                        workers=workers)
+    assert np.array_equal(index, index1)
+    assert np.array_equal(area, area1)
+    assert np.array_equal(counts, counts1)
+
+
+def test_clip_multi_executor_invalid():
+    """
+    Test invalid executor values.
+    """
+    px = np.array([[3.4, 3.4, 4.4, 4.4]])
+    py = np.array([[1.4, 1.9, 1.9, 1.4]])
+    match = 'Invalid executor value'
+    with pytest.raises(ValueError, match=match):
+        clip_multi(px, py, (100, 100), executor='thread')
+
+
+@pytest.mark.parametrize('workers', [0, -3, 2.5, '2'])
+def test_clip_multi_workers_invalid(workers):
+    """
+    Test invalid workers values.
+    """
+    px = np.array([[3.4, 3.4, 4.4, 4.4]])
+    py = np.array([[1.4, 1.9, 1.9, 1.4]])
+    match = 'workers must be a positive integer'
+    with pytest.raises(ValueError, match=match):
+        clip_multi(px, py, (100, 100), executor='process', workers=workers)
+
+    match = 'workers can only be used with executor="process"'
+    with pytest.raises(ValueError, match=match):
+        clip_multi(px, py, (100, 100), workers=4)
+
+
 def test_clip_multi_list(*, plot=False):
     """
     Test clipping multiple polygons in a single pass.